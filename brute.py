@@ -1,33 +1,107 @@
 # This code is mostly taken from: https://www.geeksforgeeks.org/traveling-salesman-problem-tsp-implementation/
 
-from sys import maxsize
-from itertools import permutations
+import numpy as np
+from numba import njit
 
 
-def brute(graph, s=0):
-    V = len(graph)
-    # store all vertex apart from source vertex
-    vertex = []
+# Return the weight of the Hamiltonian cycle s -> perm[0] -> ... -> perm[-1] -> s
+@njit(cache=True)
+def _tour_cost(graph, s, perm):
+    cost = 0
+    k = s
+    for j in perm:
+        cost += graph[k, j]
+        k = j
+    return cost + graph[k, s]
+
+
+# Greedily build a tour by always moving to the closest unvisited vertex. Its weight is a cheap upper bound that lets
+# the search below prune from the very first branch
+@njit(cache=True)
+def _nearest_neighbor(graph, s):
+    V = graph.shape[0]
+    used = np.zeros(V, dtype=np.bool_)
+    used[s] = True
+    perm = np.empty(V - 1, dtype=np.int32)
+    k = s
+    for depth in range(V - 1):
+        best = -1
+        for j in range(V):
+            if not used[j] and (best == -1 or graph[k, j] < graph[k, best]):
+                best = j
+        perm[depth] = best
+        used[best] = True
+        k = best
+    return perm
+
+
+# Depth-first search over tours that extends perm one vertex at a time and backtracks through an explicit stack.
+# remaining[depth] is the sum of min_out over the vertices not yet visited, all of which still have to be left, so
+# partial + remaining never overestimates the cost of a completed tour and any branch where it reaches min_cost can be
+# skipped. The graph is passed flattened so every edge read is a single load at row_offset + city
+@njit(cache=True)
+def _dfs(flat, V, s, min_out, min_cost, min_path):
+    used = np.zeros(V, dtype=np.bool_)
+    used[s] = True
+    perm = np.empty(V - 1, dtype=np.int32)
+    next_city = np.zeros(V, dtype=np.int32)
+    partial = np.zeros(V, dtype=np.int64)
+    remaining = np.zeros(V, dtype=np.int64)
+    remaining[0] = min_out.sum() - min_out[s]
+
+    depth = 0
+    while depth >= 0:
+        last = perm[depth - 1] if depth > 0 else s
+        row_offset = last * V
+        if depth == V - 1:
+            current_pathweight = partial[depth] + flat[row_offset + s]
+            # update minimum
+            if current_pathweight < min_cost:
+                min_cost = current_pathweight
+                min_path[:] = perm
+            c = V
+        else:
+            c = next_city[depth]
+            while c < V and (used[c] or partial[depth] + flat[row_offset + c] + remaining[depth] >= min_cost):
+                c += 1
+
+        if c == V:
+            # every branch at this depth is done, go back up
+            depth -= 1
+            if depth >= 0:
+                used[perm[depth]] = False
+            continue
+
+        next_city[depth] = c + 1
+        perm[depth] = c
+        used[c] = True
+        partial[depth + 1] = partial[depth] + flat[row_offset + c]
+        remaining[depth + 1] = remaining[depth] - min_out[c]
+        next_city[depth + 1] = 0
+        depth += 1
+    return min_cost
+
+
+@njit(cache=True)
+def _brute_kernel(graph, s):
+    V = graph.shape[0]
+    # cheapest edge leaving each vertex, used as a lower bound on the cost still to come
+    min_out = np.zeros(V, dtype=np.int64)
     for i in range(V):
-        if i != s:
-            vertex.append(i)
-
-    # store minimum weight Hamiltonian Cycle
-    min_cost = maxsize
-    min_path = []
-    next_permutation = permutations(vertex)
-    for i in next_permutation:
-        # store current Path weight(cost)
-        current_pathweight = 0
-        # compute current path weight
-        k = s
-        for j in i:
-            current_pathweight += graph[k][j]
-            k = j
-        current_pathweight += graph[k][s]
-        # update minimum
-        if current_pathweight < min_cost:
-            min_cost = current_pathweight
-            min_path = i
-
-    return min_cost, [0] + list(min_path) + [0]
\ No newline at end of file
+        first = True
+        for j in range(V):
+            if j != i and (first or graph[i, j] < min_out[i]):
+                min_out[i] = graph[i, j]
+                first = False
+
+    # store minimum weight Hamiltonian Cycle, seeded with the nearest neighbor tour
+    min_path = _nearest_neighbor(graph, s)
+    min_cost = _tour_cost(graph, s, min_path)
+    min_cost = _dfs(graph.ravel(), V, s, min_out, min_cost, min_path)
+    return min_cost, min_path
+
+
+def brute(graph, s=0):
+    graph = np.ascontiguousarray(graph, dtype=np.int32)
+    min_cost, min_path = _brute_kernel(graph, s)
+    return int(min_cost), [s] + min_path.tolist() + [s]
@@ -1,28 +1,82 @@
 # This code is mostly taken from: https://www.interviewbit.com/blog/travelling-salesman-problem/
 
-MAX = 999999
+import numpy as np
+from numba import njit, prange
 
-def TSP(mask, pos, graph, dp, n, visited):
-    if mask == visited:
-        return graph[pos][0]
-    if dp[mask][pos] != -1:
-        return dp[mask][pos]
-    ans = MAX
-    for city in range(0, n):
-        if ((mask & (1 << city)) == 0):
-            new = graph[pos][city] + TSP(mask | (1 << city), city, graph, dp, n, visited)
-            ans = min(ans, new)
+# Marks states that have not been reached. Half of the int32 range so that adding one more edge to it cannot overflow
+MAX = np.iinfo(np.int32).max // 2
 
-    dp[mask][pos] = ans
-    return dp[mask][pos]
+# Return every mask that contains city 0 sorted by the number of cities in it, along with `starts` where the masks
+# with exactly p cities are masks[starts[p]:starts[p + 1]]
+def _masks_by_size(n, symmetric):
+    masks = np.arange(1, 1 << n, 2, dtype=np.int64)
+    # A symmetric tour costs the same as its reverse, and one of the two visits city 1 before city 2. So paths
+    # that reach city 2 first never need to be computed
+    if symmetric:
+        masks = masks[(masks & 6) != 4]
+    sizes = np.zeros(len(masks), dtype=np.int64)
+    for city in range(n):
+        sizes += (masks >> city) & 1
+    order = np.argsort(sizes, kind="stable")
+    return masks[order], np.searchsorted(sizes[order], np.arange(n + 2))
 
 
-def dp(graph):
+# Fill dp[mask, pos] with the cheapest path that starts at city 0, visits exactly the cities in mask and ends at pos.
+# parent[mask, pos] records the city visited right before pos on that path
+@njit(parallel=True, cache=True)
+def _tsp_kernel(graph, dp, parent, n, masks, starts):
+    dp[1, 0] = 0
+    # Each state only reads states with one city fewer, so all masks of the same size are independent of each other
+    # and every thread writes to its own rows of dp and parent
+    for size in range(2, n + 1):
+        for k in prange(starts[size], starts[size + 1]):
+            mask = masks[k]
+            for pos in range(1, n):
+                if not (mask >> pos) & 1:
+                    continue
+                prev_mask = mask ^ (1 << pos)
+                best = MAX
+                best_prev = -1
+                for prev in range(n):
+                    if (prev_mask >> prev) & 1 and dp[prev_mask, prev] != MAX:
+                        new = dp[prev_mask, prev] + graph[prev, pos]
+                        if new < best:
+                            best = new
+                            best_prev = prev
+                dp[mask, pos] = best
+                parent[mask, pos] = best_prev
+
+
+def dp(graph, symmetric=False):
+    graph = np.ascontiguousarray(graph, dtype=np.int32)
+    if symmetric and not (graph == graph.T).all():
+        raise ValueError("symmetric=True needs graph[i][j] == graph[j][i]")
     n = len(graph)
+    # Every path has at most n edges, so this keeps all real costs below the sentinel
+    if n and n * int(graph.max()) >= MAX:
+        raise ValueError(f"distances must be below {MAX // n} for a {n}-city graph")
     visited = (1 << n) - 1
-    r, c = 1 << n, n
-    dp = [[-1 for _ in range(c)] for _ in range(r)]
-    for i in range(0, (1 << n)):
-        for j in range(0, n):
-            dp[i][j] = -1
-    return TSP(1, 0, graph, dp, n, visited), []
\ No newline at end of file
+    # int32 instead of boxed Python ints keeps the whole table in one contiguous block
+    dp = np.full((1 << n, n), MAX, dtype=np.int32)
+    parent = np.full((1 << n, n), -1, dtype=np.int8)
+    masks, starts = _masks_by_size(n, symmetric)
+    _tsp_kernel(graph, dp, parent, n, masks, starts)
+
+    # Close the tour by returning to city 0 from the best last city. dp[visited, 0] is never a real path, so city 0
+    # is left out of the candidates
+    if n == 1:
+        return int(graph[0, 0]), [0, 0]
+    pos = 1 + int(np.argmin(dp[visited, 1:].astype(np.int64) + graph[1:, 0]))
+    if dp[visited, pos] == MAX:
+        return -1, []
+    cost = int(dp[visited, pos]) + int(graph[pos, 0])
+
+    # Walk the parent pointers back from the last city to rebuild the tour
+    mask = visited
+    path = [0]
+    while pos != 0:
+        path.append(pos)
+        prev = int(parent[mask, pos])
+        mask ^= 1 << pos
+        pos = prev
+    return cost, [0] + path[::-1]
@@ -19,7 +19,7 @@ for dimension in dimensions:
 # Constraint 1: There are 5 houses
 # Each variable needs to be assigned to one of the 5 houses
 for variable in variables:
-    s.add(And(variable >= 1, variable <= 5))
+    s.add(variable >= 1, variable <= 5)
 
 s.add(Englishman == Red) # Constraint 2: The Englishman lives in the red house
 s.add(Spaniard == Dog) # Constraint 3: The Spaniard owns the dog
@@ -1,69 +1,133 @@
+from functools import lru_cache
 from z3 import *
 
-# Given an adjacency matrix describing a graph, return the minimum cost and route that starts at city 0, visits each
-# city exactly once and returns to city 0
-def smt(distances):
-    num_cities = len(distances)
+
+# Build the solver for every TSP instance with `num_cities` cities. The distances are left as the `dist_params` Int
+# constants, which get bound to concrete values for the duration of one call to `solve_model`. The encoding only
+# depends on the number of cities, so it is built once per size and the same solver, along with everything it has
+# learned, is reused for every instance of that size
+@lru_cache(maxsize=None)
+def build_model(num_cities):
     s = Optimize()
 
     # Variables representing our decision to use an edge or not
     edges_used = [[Bool("r_%s_%s" % (i, j)) for j in range(num_cities)] for i in range(num_cities)]
+    # The same edges as 0/1 integers. Built once here and shared by every linear constraint below instead of creating a
+    # fresh If(edge, 1, 0) term at each use
+    edge_ints = [[If(edges_used[i][j], 1, 0) for j in range(num_cities)] for i in range(num_cities)]
+
+    # Variables standing in for the distance of each edge
+    dist_params = [[Int("d_%s_%s" % (i, j)) for j in range(num_cities)] for i in range(num_cities)]
 
-    # Variable representing the total distance traveled. If we use an edge, then its distance
-    # is added to total_distance
+    # Variable representing the total distance traveled
     total_distance = Int("total_distance")
-    s.add(total_distance == Sum(
-        [If(edges_used[i][j], distances[i][j], 0) for i in range(num_cities) for j in range(num_cities)]))
 
     # Variables representing the order in which cities are visited. This will help us eliminate
-    # subtours by applying the MTZ constraint (explained below)
+    # subtours by applying the MTZ constraint (explained below). City 0 is always visited first
     orders = [Int("order_%s" % i) for i in range(num_cities)]
-    for i in range(num_cities):
-        s.add(orders[i] >= 0, orders[i] < num_cities)
 
-    # Add constraint that binds edges_used with the order in which cities are visited
+    # Walk the edge matrix once, collecting the terms of every constraint that is built from it
+    cost_terms = []
+    range_constraints = [orders[0] == 0]
+    loop_constraints = []
+    mtz_constraints = []
+    row_terms = [[] for _ in range(num_cities)]
+    col_terms = [[] for _ in range(num_cities)]
     for i in range(num_cities):
+        edges_i, ints_i, dist_i = edges_used[i], edge_ints[i], dist_params[i]
+        # You can't travel from a city to itself
+        loop_constraints.append(Not(edges_i[i]))
+        if i != 0:
+            range_constraints.append(orders[i] >= 1)
+            range_constraints.append(orders[i] < num_cities)
+            # Lifted bounds: the city reached from city 0 is visited first and the city that returns to city 0 is
+            # visited last
+            mtz_constraints.append(orders[i] + (num_cities - 2) * edge_ints[0][i] <= num_cities - 1)
+            mtz_constraints.append(orders[i] - (num_cities - 2) * ints_i[0] >= 1)
+
         for j in range(num_cities):
-            if i != j:
-                # Apply MTZ constraint to eliminate subtours from our solution. All this means is that if we use an edge
-                # from city i -> city j, then city j must be visited after city i. This also ensures that city 0 is
-                # visited first
-                if j != 0:
-                    s.add(If(edges_used[i][j] == True, orders[j] > orders[i], True))
-            else:
-                # You can't travel from a city to itself
-                s.add(edges_used[i][j] == False)
+            if i == j:
+                continue
+            # If we use an edge, then its distance is added to total_distance. Self-loops are never used, so they
+            # are left out of the sum and of the row and column sums below
+            cost_terms.append(If(edges_i[j], dist_i[j], 0))
+            row_terms[i].append(ints_i[j])
+            col_terms[j].append(ints_i[j])
+            if i != 0 and j != 0:
+                # Apply the Desrochers-Laporte lifted MTZ constraint to eliminate subtours from our solution. Together
+                # with the same constraint for (j, i), using the edge i -> j forces city j to be visited right after
+                # city i. The extra (n - 3) * edges_used[j][i] term makes this much tighter than the textbook
+                # u_i - u_j + (n - 1) * x_ij <= n - 2 cut
+                mtz_constraints.append(orders[i] - orders[j] + (num_cities - 1) * ints_i[j]
+                                       + (num_cities - 3) * edge_ints[j][i] <= num_cities - 2)
 
     # Add constraint to ensure that each city in the tour has only one predecessor and one successor. This can be
-    # enforced by ensuring the sum of each row and column in the `edges_used` matrix is 1. Use Bools instead of
-    # Integers to encode this constraint more efficiently
+    # enforced by ensuring the sum of each row and column in the `edges_used` matrix is 1
+    degree_constraints = []
     for i in range(num_cities):
-        visited = False
-        for j in range(num_cities):
-            s.add(If(edges_used[i][j] == True, visited == False, True))
-            visited = Or(visited, edges_used[i][j])
-        s.add(visited == True)
+        degree_constraints.append(Sum(row_terms[i]) == 1)
+        degree_constraints.append(Sum(col_terms[i]) == 1)
+
+    # Hand everything to the solver in one call. The groups keep the order they were originally added in, which the
+    # solver's heuristics are sensitive to
+    s.add([total_distance == Sum(cost_terms)] + range_constraints + loop_constraints + mtz_constraints
+          + degree_constraints)
 
-    # Call the solver and return the minimum cost and tour path
     s.minimize(total_distance)
-    if s.check() == sat:
-        model = s.model()
-        min_tour_cost = model[total_distance].as_long()
-        return min_tour_cost, get_tour_path(s, 0, num_cities, edges_used)
-    else:
+    return s, orders, total_distance, dist_params
+
+
+# Given an adjacency matrix describing a graph, return the minimum cost and route that starts at city 0, visits each
+# city exactly once and returns to city 0
+def smt(distances):
+    return solve_model(build_model(len(distances)), distances)
+
+
+# Solve one instance on a solver returned by `build_model`
+def solve_model(model, distances):
+    s, orders, total_distance, dist_params = model
+    num_cities = len(distances)
+
+    # Bind the distances inside a scope of their own so the solver can be reused for the next instance. The scope is
+    # popped even if solving is interrupted, otherwise the stale bindings would make every later instance unsat
+    s.push()
+    try:
+        s.add([dist_params[i][j] == int(distances[i][j]) for i in range(num_cities) for j in range(num_cities)])
+        # A greedy tour is never better than the optimum, so its cost is a safe upper bound that lets the solver
+        # discard most of the objective range before it starts searching
+        nn_cost, _ = nearest_neighbor_tour(distances)
+        s.add(total_distance <= nn_cost)
+
+        # Call the solver and return the minimum cost and tour path
+        if s.check() == sat:
+            min_tour_cost = s.model()[total_distance].as_long()
+            return min_tour_cost, get_tour_path(s, orders)
         return -1, []
+    finally:
+        s.pop()
 
 
-# Return the optimal tour path found by the solver
-def get_tour_path(s, start_city, num_cities, routes):
-    model = s.model()
-    curr_city = start_city
-    path = []
-    for i in range(num_cities):
-        for j in range(num_cities):
-            if model[routes[curr_city][j]]:
-                path.append(curr_city)
-                curr_city = j
-                break
+# Return the cost and route of the tour that starts at city 0 and always moves to the closest unvisited city
+def nearest_neighbor_tour(distances):
+    num_cities = len(distances)
+    curr_city = 0
+    cost = 0
+    path = [0]
+    unvisited = set(range(1, num_cities))
+    while unvisited:
+        next_city = min(unvisited, key=lambda j: distances[curr_city][j])
+        cost += int(distances[curr_city][next_city])
+        unvisited.remove(next_city)
+        path.append(next_city)
+        curr_city = next_city
+    cost += int(distances[curr_city][0])
+    return cost, path + [0]
+
 
-    return path + [start_city]
+# Return the optimal tour path found by the solver. The lifted MTZ constraints pin orders[i] to the exact position of
+# city i in the tour, so sorting the cities by it recovers the route from n model lookups instead of scanning the
+# edges_used matrix
+def get_tour_path(s, orders):
+    model = s.model()
+    path = sorted(range(len(orders)), key=lambda i: model[orders[i]].as_long())
+    return path + [path[0]]
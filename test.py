@@ -1,8 +1,7 @@
 from smt import smt
 from brute import brute
-import random
+import numpy as np
 import time
-import matplotlib.pyplot as plt
 
 ''''
 distances = [
@@ -22,15 +21,20 @@ smt_times = []
 brute_sizes = []
 brute_times = []
 
+rng = np.random.default_rng()
+
 for _ in range(300):
-    size = random.randint(2, max_size)
-    distances = [[random.randint(0, 100) for _ in range(size)] for _ in range(size)]
-    for i in range(size):
-        distances[i][i] = 0
-    print(f"size {size}, distances {distances}")
+    size = int(rng.integers(2, max_size, endpoint=True))
+    distances = rng.integers(0, 100, size=(size, size), dtype=np.int32, endpoint=True)
+    # Keep the matrix symmetric like a real road network
+    distances = (distances + distances.T) // 2
+    np.fill_diagonal(distances, 0)
+    # Z3 only takes Python ints, so convert the matrix once instead of unboxing NumPy scalars inside the timed call
+    distances_list = distances.tolist()
+    print(f"size {size}, distances {distances_list}")
     if smt_enabled:
         start = time.perf_counter()
-        smt_dist, smt_path = smt(distances)
+        smt_dist, smt_path = smt(distances_list)
         smt_time = time.perf_counter() - start
         print(f"smt: {smt_dist}, {smt_path}")
         print(f"smt took {smt_time}")
@@ -51,8 +55,12 @@ for _ in range(300):
             print("DISAGREE")
 
 
-plt.scatter(brute_sizes, brute_times, label="brute")
-plt.scatter(smt_sizes, smt_times, label="smt")
-plt.xlabel('Cities')
-plt.ylabel('Time (seconds)')
-plt.show()
\ No newline at end of file
+# Only pull in matplotlib when there are timings to plot, it is by far the slowest import here
+if smt_sizes or brute_sizes:
+    import matplotlib.pyplot as plt
+
+    plt.scatter(brute_sizes, brute_times, label="brute")
+    plt.scatter(smt_sizes, smt_times, label="smt")
+    plt.xlabel('Cities')
+    plt.ylabel('Time (seconds)')
+    plt.show()
\ No newline at end of file